@@ -5,18 +5,69 @@ A simple Bottle application that receives SMS messages from the DHIS2 SMS Gatewa
 and stores them in Redis for further processing.
 """
 
+# Patch the standard library before anything opens sockets (redis, requests)
+# so every request runs on its own greenlet and yields while waiting on I/O
+from gevent import monkey
+monkey.patch_all()
+
 import os
+import atexit
+import collections
+import csv
+import functools
+import gzip
+import hashlib
+import io
+import itertools
 import json
 import logging
+import logging.handlers
+import queue
 import redis
-import uuid
+import socket
+import sys
+import threading
+import time
+import traceback
 from datetime import datetime
-from bottle import Bottle, request, response, run
+from bottle import BaseRequest, Bottle, JSONPlugin, request, response
+import gevent
+import gevent.queue
+from gevent.event import AsyncResult, Event
+from gevent.pywsgi import WSGIServer
 
 
 import requests
 import base64
-from urllib.parse import urljoin
+from urllib.parse import parse_qsl, unquote_plus, urljoin
+
+# orjson is much faster than the stdlib json module; fall back to the latter
+# when the wheel is not available on the platform
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson:
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+    # Stored JSON is embedded in responses as-is instead of being parsed
+    json_fragment = orjson.Fragment
+
+    def json_dumps_pretty(obj):
+        """Serialize obj as indented JSON text for log output"""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+else:
+    def json_dumps(obj):
+        """Serialize obj as compact JSON bytes"""
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+    json_loads = json.loads
+    json_fragment = json.loads
+
+    def json_dumps_pretty(obj):
+        """Serialize obj as indented JSON text for log output"""
+        return json.dumps(obj, indent=2)
 
 
 # Configure logging
@@ -24,15 +75,100 @@ log_level = os.environ.get('LOG_LEVEL', 'info').upper()
 log_file = "/var/log/sms_receiver/sms_receiver.log"
 os.makedirs(os.path.dirname(log_file), exist_ok=True)
 
+
+class BatchStreamHandler(logging.StreamHandler):
+    """StreamHandler that buffers records until its owner calls flush()"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pending = []
+
+    def emit(self, record):
+        # StreamHandler.emit writes and flushes after every record; only
+        # format here
+        try:
+            self.pending.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        if not self.pending:
+            return
+        text = ''.join(self.pending)
+        self.pending = []
+        # File and pipe writes block the OS thread, so they run on gevent's
+        # native threadpool while the hub keeps serving requests
+        gevent.get_hub().threadpool.apply(self.write_pending, (text,))
+
+    def write_pending(self, text):
+        """Write a batch of formatted records and flush the stream"""
+        try:
+            self.stream.write(text)
+            self.stream.flush()
+        except Exception:
+            # The batch has no single record to hand to handleError
+            if logging.raiseExceptions:
+                traceback.print_exc()
+
+
+class BatchFileHandler(BatchStreamHandler, logging.FileHandler):
+    """FileHandler that buffers records until its owner calls flush()"""
+
+    def write_pending(self, text):
+        """Write a batch of formatted records, reopening the file if closed"""
+        if self.stream is None:
+            self.stream = self._open()
+        super().write_pending(text)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves all formatting to the listener"""
+
+    def prepare(self, record):
+        # The queue never leaves this process, so the record is passed on
+        # as-is and its message is only built by the listener's handlers
+        return record
+
+
+class BatchQueueListener(logging.handlers.QueueListener):
+    """QueueListener that flushes its handlers once the queue is drained"""
+
+    def handle(self, record):
+        super().handle(record)
+        # A burst of records reaches the log file in one write
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+
+# Request handlers only enqueue log records. The listener runs as a greenlet
+# (threading is monkey-patched) and formats them; its handlers hand each
+# drained batch to a native thread, so disk and console writes never stall
+# the hub that serves requests
+log_queue = queue.Queue(-1)
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+log_file_handler = BatchFileHandler(log_file)
+log_file_handler.setFormatter(log_formatter)
+log_console_handler = BatchStreamHandler()
+log_console_handler.setFormatter(log_formatter)
+log_listener = BatchQueueListener(
+    log_queue,
+    log_file_handler,
+    log_console_handler,
+    respect_handler_level=True
+)
+log_queue_handler = DeferredQueueHandler(log_queue)
+
 logging.basicConfig(
     level=getattr(logging, log_level),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler()
-    ]
+    handlers=[log_queue_handler]
 )
+log_listener.start()
+atexit.register(log_listener.stop)
 logger = logging.getLogger('dhis2_sms_receiver')
+# Hand records straight to the queue rather than walking up to the root logger
+logger.addHandler(log_queue_handler)
+logger.propagate = False
 
 # SMS port setting
 SMS_PORT = int(os.environ.get('SMS_PORT', 8002))
@@ -41,23 +177,83 @@ SMS_PORT = int(os.environ.get('SMS_PORT', 8002))
 REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
 REDIS_PORT = int(os.environ.get('REDIS_PORT', 6379))
 REDIS_DB = int(os.environ.get('REDIS_DB', 0))
+# Upper bound on concurrent Redis connections per pool; match it to the
+# number of greenlets expected to talk to Redis at the same time. Each worker
+# has two pools (redis_client and redis_bytes), so it may open twice this many
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 64))
+# Path to the Redis UNIX socket when Redis runs on the same host; takes
+# precedence over REDIS_HOST/REDIS_PORT and skips the TCP loopback
+REDIS_SOCKET = os.environ.get('REDIS_SOCKET')
 
 # Initialize Redis connection
-try:
-    redis_client = redis.Redis(
+# A blocking pool makes greenlets wait for a free connection instead of
+# failing when every connection is checked out
+REDIS_POOL_OPTIONS = {
+    'db': REDIS_DB,
+    'max_connections': REDIS_MAX_CONNECTIONS,
+    'timeout': 5,
+    'socket_connect_timeout': 5,
+    'socket_timeout': 5,
+    # Ping connections idle for longer than this before reusing them
+    'health_check_interval': 30
+}
+if REDIS_SOCKET:
+    REDIS_POOL_OPTIONS.update(
+        connection_class=redis.UnixDomainSocketConnection,
+        path=REDIS_SOCKET
+    )
+    REDIS_LOCATION = f"unix://{REDIS_SOCKET}"
+else:
+    REDIS_POOL_OPTIONS.update(
         host=REDIS_HOST,
         port=REDIS_PORT,
-        db=REDIS_DB,
-        decode_responses=True,
-        socket_connect_timeout=5,
-        socket_timeout=5
+        socket_keepalive=True,
+        # Probe an idle connection after 60s so one dropped by a NAT or
+        # firewall is noticed in about 90s rather than the kernel's 2 hours
+        socket_keepalive_options={
+            getattr(socket, name): value
+            for name, value in (('TCP_KEEPIDLE', 60), ('TCP_KEEPINTVL', 10), ('TCP_KEEPCNT', 3))
+            if hasattr(socket, name)
+        }
     )
+    REDIS_LOCATION = f"{REDIS_HOST}:{REDIS_PORT}"
+
+try:
+    redis_pool = redis.BlockingConnectionPool(decode_responses=True, **REDIS_POOL_OPTIONS)
+    redis_client = redis.Redis(connection_pool=redis_pool)
+    # Read paths that hand stored values straight to the JSON encoder use an undecoded
+    # client so those values are never turned into Python str
+    redis_bytes = redis.Redis(connection_pool=redis.BlockingConnectionPool(**REDIS_POOL_OPTIONS))
     # Test connection
     redis_client.ping()
-    logger.info(f"Connected to Redis at {REDIS_HOST}:{REDIS_PORT}")
+    logger.info(f"Connected to Redis at {REDIS_LOCATION}")
 except Exception as e:
     logger.error(f"Failed to connect to Redis: {e}")
     redis_client = None
+    redis_bytes = None
+
+# Cap on the sms:unprocessed queue; the oldest ids are dropped beyond this
+# so a stalled consumer cannot grow the list without bound
+SMS_UNPROCESSED_MAX = int(os.environ.get('SMS_UNPROCESSED_MAX', 100000))
+
+# Stored SMS hashes and their indexes expire after 30 days
+SMS_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# Seconds an encoded /sms/stats response is reused from Redis
+STATS_CACHE_KEY = "sms:stats:cache"
+STATS_CACHE_TTL = 10
+
+# Channel the store script publishes each new SMS id on
+SMS_EVENTS_CHANNEL = "sms:events"
+# Channel an SMS id is published on when its DHIS2 forward status is recorded
+SMS_STATUS_CHANNEL = "sms:events:status"
+
+# Bytes of each request body written to the debug log; SMS payloads fit well
+# within this, and anything larger is cut rather than copied into the log
+RAW_BODY_LOG_LIMIT = 512
+
+# Read each outbound SMS back after storing it and log what Redis holds
+DEBUG_STORE_VERIFY = os.environ.get('DEBUG_STORE_VERIFY', '').lower() in ('1', 'true', 'yes')
 
 # Add these environment variables at the top with other configs
 DHIS2_URL = os.environ.get('DHIS2_URL', 'https://dhis2:8443')
@@ -65,7 +261,241 @@ DHIS2_USERNAME = os.environ.get('DHIS2_USERNAME', 'admin')
 DHIS2_PASSWORD = os.environ.get('DHIS2_PASSWORD', 'district')
 
 # Initialize Bottle app
-app = Bottle()
+# Dict responses are encoded with json_dumps so stored JSON (raw_data) can be
+# embedded as a json_fragment instead of being parsed on every read. Bottle
+# sends the encoded bytes as they are, with no decode/encode round trip.
+app = Bottle(autojson=False)
+app.install(JSONPlugin(json_dumps=json_dumps))
+
+# SMS payloads are a few hundred bytes. Larger bodies are refused with 413
+# before anything is read, so they are neither spooled to disk nor buffered;
+# Bottle's form parsing uses the same limit.
+MAX_BODY_BYTES = 64 * 1024
+BaseRequest.MEMFILE_MAX = MAX_BODY_BYTES
+
+
+def body_too_large():
+    """413 response for a request whose declared body exceeds MAX_BODY_BYTES, else None"""
+    if request.content_length > MAX_BODY_BYTES:
+        response.status = 413
+        return {"status": "error", "message": f"Request body exceeds {MAX_BODY_BYTES} bytes"}
+    return None
+
+
+# SMS ids are ULIDs: a 48-bit millisecond timestamp followed by 80 random bits
+# in Crockford base32. They sort by creation time and take 26 characters
+# instead of a UUID's 36. The random parts come from a pool so the os.urandom
+# syscall is paid once per batch rather than once per message.
+ULID_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+ULID_RANDOM_BATCH = 128
+_ulid_random_pool = collections.deque()
+_ulid_random_pool_lock = threading.Lock()
+
+
+def _refill_ulid_random_pool():
+    """Generate a batch of 80-bit random ULID suffixes"""
+    raw = os.urandom(10 * ULID_RANDOM_BATCH)
+    _ulid_random_pool.extend(int.from_bytes(raw[offset:offset + 10], 'big')
+                             for offset in range(0, len(raw), 10))
+
+
+def next_sms_id():
+    """Return a new unique, time-ordered SMS id"""
+    while True:
+        try:
+            randomness = _ulid_random_pool.popleft()
+            break
+        except IndexError:
+            with _ulid_random_pool_lock:
+                if not _ulid_random_pool:
+                    _refill_ulid_random_pool()
+
+    value = (time.time_ns() // 1000000) << 80 | randomness
+    chars = []
+    for _ in range(26):
+        chars.append(ULID_ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+# datetime.fromisoformat is a C parser that accepts a trailing 'Z' from Python
+# 3.11 on; older versions need it spelled as an offset first
+if sys.version_info >= (3, 11):
+    parse_iso_timestamp = datetime.fromisoformat
+else:
+    def parse_iso_timestamp(timestamp):
+        """Parse an ISO 8601 timestamp, accepting 'Z' for UTC"""
+        return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+
+# Rebuilding the timeline re-reads timestamps that were already scored by an
+# earlier rebuild or repeat across a batch import, so scores are memoised
+@functools.lru_cache(maxsize=8192)
+def _timestamp_score(timestamp):
+    """Timeline score (epoch seconds) for an ISO 8601 timestamp"""
+    return parse_iso_timestamp(timestamp).timestamp()
+
+
+# DHIS2 and the SMS providers use different field names for the same value.
+# The lookups are bound to dict.get once so each chain runs on fast locals.
+def extract_outbound_phone(data, recipients, get=dict.get):
+    """Recipient phone number of an outbound SMS request"""
+    return (get(data, 'recipient') or
+            get(data, 'to') or
+            get(data, 'msisdn') or
+            get(data, 'originator') or  # Sometimes DHIS2 uses this
+            (recipients[0] if recipients else 'unknown'))
+
+
+def extract_inbound_phone(data, get=dict.get):
+    """Sender phone number of an inbound SMS"""
+    return (get(data, 'originator') or
+            get(data, 'from') or
+            get(data, 'sender') or
+            get(data, 'msisdn') or
+            'unknown')
+
+
+def extract_message(data, default, get=dict.get):
+    """Message text of an SMS request, or default when none is present"""
+    return (get(data, 'message') or
+            get(data, 'text') or
+            get(data, 'content') or
+            default)
+
+
+# Server-side write of a new SMS, so storing one costs a single EVALSHA
+# KEYS: sms hash, timeline, phone index, type index, date index, unprocessed
+#       queue
+# ARGV: sms id, timeline score, ttl seconds, unprocessed queue cap, events
+#       channel, then the hash field/value pairs
+# The phone/type/date indexes are sorted by the same score as the timeline so
+# filtered listings can page through them newest first. Each index expires
+# one TTL after its last write, by which point every hash it names is gone.
+# The new id is published on the events channel for /sms/stream. The cached
+# stats are left to expire, so steady ingest cannot defeat the cache.
+STORE_SMS_LUA = """
+local sms_id = ARGV[1]
+redis.call('HSET', KEYS[1], unpack(ARGV, 6))
+redis.call('ZADD', KEYS[2], ARGV[2], sms_id)
+for i = 3, 5 do
+    redis.call('ZADD', KEYS[i], ARGV[2], sms_id)
+    redis.call('EXPIRE', KEYS[i], ARGV[3])
+end
+redis.call('LPUSH', KEYS[6], sms_id)
+redis.call('LTRIM', KEYS[6], 0, ARGV[4] - 1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('PUBLISH', ARGV[5], sms_id)
+return sms_id
+"""
+
+# Load the script at startup so the first writes do not each pay a NOSCRIPT
+# miss; the flusher reloads it if Redis later loses its script cache
+store_sms_script = None
+if redis_client:
+    store_sms_script = redis_client.register_script(STORE_SMS_LUA)
+    try:
+        redis_client.script_load(STORE_SMS_LUA)
+    except Exception as e:
+        logger.warning(f"Failed to preload SMS store script: {e}")
+
+# SMS writes from concurrent requests are grouped by a single flusher
+# greenlet and sent to Redis as one pipeline per batch. Producers append to a
+# deque (atomic without a lock) and wake the flusher through an Event. Each
+# caller still waits for the result of its own write, so a request only
+# reports success once the SMS is actually stored.
+_store_queue = collections.deque()
+# Seconds a request waits for its queued write before giving up
+STORE_WRITE_TIMEOUT = 10
+_store_pending = Event()
+_store_flusher = None
+
+
+def _execute_store_batch(batch):
+    """Run the store script for each queued write in one pipeline"""
+    pipe = redis_client.pipeline(transaction=False)
+    for keys, args, _ in batch:
+        pipe.evalsha(store_sms_script.sha, len(keys), *keys, *args)
+    return pipe.execute(raise_on_error=False)
+
+
+def _flush_store_queue():
+    """Drain queued SMS writes into Redis, batching whatever is waiting"""
+    while True:
+        _store_pending.wait()
+        _store_pending.clear()
+        batch = []
+        while _store_queue:
+            batch.append(_store_queue.popleft())
+        if not batch:
+            continue
+
+        try:
+            replies = _execute_store_batch(batch)
+            missing = [i for i, reply in enumerate(replies)
+                       if isinstance(reply, redis.exceptions.NoScriptError)]
+            if missing:
+                # Redis restarted or its script cache was flushed
+                redis_client.script_load(STORE_SMS_LUA)
+                retried = _execute_store_batch([batch[i] for i in missing])
+                for i, reply in zip(missing, retried):
+                    replies[i] = reply
+        except Exception as e:
+            logger.error(f"Error flushing {len(batch)} SMS to Redis: {e}")
+            # Retry each write on its own so one failing entry cannot fail
+            # the rest of its batch
+            replies = []
+            for entry in batch:
+                try:
+                    replies.extend(_execute_store_batch([entry]))
+                except Exception as entry_error:
+                    replies.append(entry_error)
+
+        for (_, _, result), reply in zip(batch, replies):
+            if isinstance(reply, Exception):
+                result.set_exception(reply)
+            else:
+                result.set(reply)
+
+
+def queue_sms_write(keys, args):
+    """Queue one store script call and wait until its batch has been written"""
+    global _store_flusher
+    if _store_flusher is None or _store_flusher.dead:
+        _store_flusher = gevent.spawn(_flush_store_queue)
+
+    # Encode up front so a value Redis cannot take (None, bool, dict, ...)
+    # raises DataError for this caller instead of failing the shared batch
+    encoder = redis_client.connection_pool.get_encoder()
+    args = [encoder.encode(arg) for arg in args]
+
+    result = AsyncResult()
+    entry = (keys, args, result)
+    _store_queue.append(entry)
+    _store_pending.set()
+    # Bounded so a caller cannot hang if the flusher dies mid-batch;
+    # gevent.Timeout is a BaseException, so it is turned into a Redis error
+    try:
+        return result.get(timeout=STORE_WRITE_TIMEOUT)
+    except gevent.Timeout:
+        pass
+
+    try:
+        # Still queued: withdraw it, so the error means nothing was written
+        # and the client can safely retry
+        _store_queue.remove(entry)
+        raise redis.exceptions.TimeoutError(f"SMS write not flushed within {STORE_WRITE_TIMEOUT}s")
+    except ValueError:
+        pass
+
+    # Already sent in a batch, so it cannot be withdrawn; wait for the real
+    # outcome. If that never comes the write may still land, and a client
+    # retrying on the error can store the SMS twice.
+    try:
+        return result.get(timeout=STORE_WRITE_TIMEOUT)
+    except gevent.Timeout:
+        logger.error(f"Write of {keys[0]} sent to Redis but unconfirmed; it may still be stored")
+        raise redis.exceptions.TimeoutError(f"SMS write unconfirmed after {2 * STORE_WRITE_TIMEOUT}s")
 
 
 def store_sms_in_redis(sms_data):
@@ -76,132 +506,142 @@ def store_sms_in_redis(sms_data):
 
     try:
         # Generate unique ID for this SMS
-        sms_id = str(uuid.uuid4())
+        sms_id = next_sms_id()
         timestamp = sms_data['timestamp']
         phone_number = sms_data['phone']
         sms_type = sms_data.get('type', 'unknown')
 
-        logger.info(f"Storing SMS {sms_id} with timestamp {timestamp}")
+        logger.debug("Storing SMS %s with timestamp %s", sms_id, timestamp)
 
-        # Store the complete SMS data
-        redis_client.hset(f"sms:{sms_id}", mapping={
+        # Callers that generated the timestamp pass its timeline score and
+        # YYYY-MM-DD key along with it; anything else is parsed once here
+        timestamp_score = sms_data.get('timestamp_score')
+        date_key = sms_data.get('date_key')
+        if timestamp_score is None or date_key is None:
+            try:
+                dt = parse_iso_timestamp(timestamp)
+            except ValueError as timeline_error:
+                logger.error(f"Error parsing timestamp for timeline: {timeline_error}")
+                # Use current time as fallback
+                dt = datetime.now()
+            timestamp_score = dt.timestamp()
+            date_key = dt.date().isoformat()
+
+        sms_key = f"sms:{sms_id}"
+        fields = {
             'id': sms_id,
             'type': sms_type,
             'phone': phone_number,
             'message': sms_data['message'],
             'timestamp': timestamp,
-            'raw_data': json.dumps(sms_data['raw_data']),
+            # Numeric copy of the timeline score, so rebuilding the timeline
+            # never has to parse the ISO timestamp
+            'ts': timestamp_score,
+            # redis-py sends bytes as-is, so the encoded JSON is not decoded
+            'raw_data': json_dumps(sms_data['raw_data']),
             'processed': 'false',
             'status': sms_data.get('status', 'pending')
-        })
+        }
 
-        # Add to time-ordered list for chronological access
-        try:
-            # Parse timestamp to get numeric value for sorting
-            if 'T' in timestamp:
-                # ISO format: 2025-06-24T11:58:08.924491
-                dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            else:
-                # Fallback parsing
-                dt = datetime.now()
+        logger.debug("Adding to timeline with score %s", timestamp_score)
+
+        # Hash, timeline, phone/type/date indexes, unprocessed queue and the
+        # 30 day expiry are all written atomically by one script call
+        queue_sms_write(
+            keys=[
+                sms_key,
+                "sms:timeline",
+                f"sms:timeline:phone:{phone_number}",
+                f"sms:timeline:type:{sms_type}",
+                f"sms:timeline:date:{date_key}",
+                "sms:unprocessed"
+            ],
+            args=[sms_id, timestamp_score, SMS_TTL_SECONDS, SMS_UNPROCESSED_MAX, SMS_EVENTS_CHANNEL,
+                  *itertools.chain.from_iterable(fields.items())]
+        )
 
-            timestamp_score = dt.timestamp()
-            logger.info(f"Adding to timeline with score {timestamp_score}")
-            redis_client.zadd("sms:timeline", {sms_id: timestamp_score})
+        logger.info(f"SMS {sms_id} ({sms_type}) stored in Redis successfully")
+        return sms_id
 
-            # Verify it was added
-            timeline_count = redis_client.zcard("sms:timeline")
-            logger.info(f"Timeline now has {timeline_count} items")
+    except Exception as e:
+        logger.error(f"Error storing SMS in Redis: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return None
 
-        except Exception as timeline_error:
-            logger.error(f"Error adding to timeline: {timeline_error}")
-            # Use current time as fallback
-            timestamp_score = datetime.now().timestamp()
-            redis_client.zadd("sms:timeline", {sms_id: timestamp_score})
 
-        # Add to phone number index for lookup by sender/recipient
-        redis_client.sadd(f"sms:phone:{phone_number}", sms_id)
+def decode_sms_hash(raw_hash):
+    """Decode an SMS hash read through redis_bytes for a JSON response"""
+    # raw_data is already a JSON document; embed its bytes without decoding
+    raw_data = raw_hash.pop(b'raw_data', b'{}')
+    sms_hash = {key.decode(): value.decode() for key, value in raw_hash.items()}
+    sms_hash['raw_data'] = json_fragment(raw_data)
+    return sms_hash
 
-        # Add to type index (inbound/outbound)
-        redis_client.sadd(f"sms:type:{sms_type}", sms_id)
 
-        # Add to daily index for reporting
-        try:
-            date_key = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).strftime('%Y-%m-%d')
-        except:
-            date_key = datetime.now().strftime('%Y-%m-%d')
-        redis_client.sadd(f"sms:date:{date_key}", sms_id)
+def parse_form_data(raw_body):
+    """Parse a form-encoded request body, falling back to the query string"""
+    if request.content_type.startswith('multipart/'):
+        # Only the non-empty MultiDict is copied; the copy is what gets stored
+        return dict(request.forms or request.query)
 
-        # Add to unprocessed queue
-        redis_client.lpush("sms:unprocessed", sms_id)
+    # Parse the body bytes already read by the handler in one pass instead of
+    # materialising Bottle's forms and params MultiDicts
+    data = {}
+    if raw_body:
+        data = dict(parse_qsl(raw_body.decode('utf-8', errors='replace'), keep_blank_values=True))
+    return data or dict(parse_qsl(request.query_string, keep_blank_values=True))
 
-        # Set expiration for SMS data (30 days)
-        redis_client.expire(f"sms:{sms_id}", 30 * 24 * 60 * 60)
 
-        logger.info(f"SMS {sms_id} ({sms_type}) stored in Redis successfully")
-        return sms_id
-
-    except Exception as e:
-        logger.error(f"Error storing SMS in Redis: {e}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        return None
+# send_sms answers every success with the same body apart from the SMS id, so
+# the JSON is encoded once here; ids are generated by us and need no escaping
+SEND_SMS_SUCCESS = json_dumps({"status": "success", "message": "SMS sent successfully"})
+SEND_SMS_SUCCESS_WITH_ID = json_dumps(
+    {"status": "success", "message": "SMS sent successfully", "sms_id": "%s"}
+)
 
 
 @app.route('/sms/send', method='POST')
 def send_sms():
     """Endpoint for DHIS2 to send outbound SMS through this gateway"""
+    too_large = body_too_large()
+    if too_large:
+        return too_large
+
     try:
         logger.info("=== OUTBOUND SMS REQUEST RECEIVED ===")
-        logger.info(f"Method: {request.method}")
-        logger.info(f"Content-Type: {request.content_type}")
-        logger.info(f"Headers: {dict(request.headers)}")
-        logger.info(f"Query params: {dict(request.params)}")
-        logger.info(f"Form data: {dict(request.forms)}")
-
-        # Log raw request for debugging
-        request.body.seek(0)
+        # Copying and formatting the request is only worth it when the
+        # output is actually kept
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Method: %s", request.method)
+            logger.debug("Content-Type: %s", request.content_type)
+            logger.debug("Headers: %s", dict(request.headers))
+            logger.debug("Query params: %s", dict(request.params))
+            logger.debug("Form data: %s", dict(request.forms))
+
+        # Bottle rewinds request.body on every access, so no seek is needed
         raw_body = request.body.read()
-        logger.info(f"Raw body: {raw_body}")
-        logger.info(f"Raw body decoded: {raw_body.decode('utf-8', errors='ignore')}")
-        request.body.seek(0)
+        if debug:
+            logger.debug("Raw body (%d bytes): %s", len(raw_body),
+                         raw_body[:RAW_BODY_LOG_LIMIT].decode('utf-8', errors='replace'))
 
         # Parse incoming request
+        # JSON is decoded straight from the bytes already read above rather
+        # than through request.json, which would read the body a second time
         data = {}
         if request.content_type and 'application/json' in request.content_type:
             try:
-                data = request.json or {}
-                logger.info(f"Parsed JSON data: {data}")
+                data = json_loads(raw_body or b'{}') or {}
+                logger.debug("Parsed JSON data: %s", data)
             except Exception as e:
                 logger.warning(f"Failed to parse JSON: {e}")
-                # Handle URL-encoded or query params
-                data = dict(request.forms) or dict(request.params)
-                logger.info(f"Fallback to form/params: {data}")
+                # Handle URL-encoded body or query params
+                data = parse_form_data(raw_body)
+                logger.debug("Fallback to form/params: %s", data)
         else:
             # Handle form data, query params, or URL template variables
-            data = dict(request.forms) or dict(request.params)
-            logger.info(f"Form/query data: {data}")
-            if not data:
-                # Try to parse as simple key=value pairs from query string
-                query_string = request.environ.get('QUERY_STRING', '')
-                logger.info(f"Query string: {query_string}")
-                if query_string:
-                    from urllib.parse import parse_qs, unquote_plus
-                    parsed = parse_qs(query_string)
-                    data = {k: unquote_plus(v[0]) if v else '' for k, v in parsed.items()}
-                    logger.info(f"Parsed query string: {data}")
-
-        # If still no data, try parsing raw body as form data
-        if not data and raw_body:
-            try:
-                from urllib.parse import parse_qs, unquote_plus
-                body_str = raw_body.decode('utf-8')
-                if '=' in body_str:
-                    parsed = parse_qs(body_str)
-                    data = {k: unquote_plus(v[0]) if v else '' for k, v in parsed.items()}
-                    logger.info(f"Parsed raw body as form data: {data}")
-            except Exception as e:
-                logger.warning(f"Failed to parse raw body: {e}")
+            data = parse_form_data(raw_body)
+            logger.debug("Form/query data: %s", data)
 
         # Extract SMS details - DHIS2 might use different field names
         recipients = data.get('recipients', [])
@@ -209,29 +649,22 @@ def send_sms():
             recipients = [recipients]
 
         # Handle different possible field names for phone numbers
-        phone_number = (data.get('recipient') or
-                        data.get('to') or
-                        data.get('msisdn') or
-                        data.get('originator') or  # Sometimes DHIS2 uses this
-                        (recipients[0] if recipients else 'unknown'))
+        phone_number = extract_outbound_phone(data, recipients)
 
         # Handle different possible field names for message content and URL decode
-        message_content = (data.get('message') or
-                           data.get('text') or
-                           data.get('content') or
-                           'No message content')
+        message_content = extract_message(data, 'No message content')
 
         # URL decode the message content to handle + symbols and other encoded characters
         if message_content and message_content != 'No message content':
-            from urllib.parse import unquote_plus
             message_content = unquote_plus(message_content)
 
-        timestamp = datetime.now().isoformat()
+        now = datetime.now()
+        timestamp = now.isoformat()
 
-        logger.info(f"=== EXTRACTED SMS DATA ===")
-        logger.info(f"Phone: {phone_number}")
-        logger.info(f"Message: {message_content}")
-        logger.info(f"Timestamp: {timestamp}")
+        logger.debug("=== EXTRACTED SMS DATA ===")
+        logger.debug("Phone: %s", phone_number)
+        logger.debug("Message: %s", message_content)
+        logger.debug("Timestamp: %s", timestamp)
 
         # Store outbound SMS in Redis for monitoring
         sms_data = {
@@ -239,6 +672,8 @@ def send_sms():
             'phone': phone_number,
             'message': message_content,
             'timestamp': timestamp,
+            'timestamp_score': now.timestamp(),
+            'date_key': now.date().isoformat(),
             'raw_data': data,
             'status': 'sent'
         }
@@ -247,8 +682,10 @@ def send_sms():
         sms_id = store_sms_in_redis(sms_data)
         logger.info(f"SMS stored with ID: {sms_id}")
 
-        # Debug: Verify storage immediately
-        if sms_id and redis_client:
+        if not sms_id:
+            logger.error("SMS was not stored - sms_id is None or Redis unavailable")
+        elif DEBUG_STORE_VERIFY:
+            # Debug: Verify storage immediately (two extra round-trips)
             try:
                 stored_data = redis_client.hgetall(f"sms:{sms_id}")
                 logger.info(f"Verification - SMS {sms_id} stored data: {stored_data}")
@@ -256,28 +693,28 @@ def send_sms():
                 logger.info(f"Timeline now has {timeline_count} SMS messages")
             except Exception as verify_error:
                 logger.error(f"Failed to verify storage: {verify_error}")
-        else:
-            logger.error("SMS was not stored - sms_id is None or Redis unavailable")
 
         # Log the full SMS data for debugging
-        logger.info(f"Complete outbound SMS data: {json.dumps(sms_data, indent=2)}")
+        if debug:
+            logger.debug("Complete outbound SMS data: %s", json_dumps_pretty(sms_data))
 
         # Here you would integrate with your actual SMS provider
         # For now, we'll just log and return success
 
         # Return success response that DHIS2 expects
-        response_data = {"status": "success", "message": "SMS sent successfully"}
+        response.content_type = 'application/json'
         if sms_id:
-            response_data["sms_id"] = sms_id
+            response_body = SEND_SMS_SUCCESS_WITH_ID % sms_id.encode()
+        else:
+            response_body = SEND_SMS_SUCCESS
 
-        logger.info(f"=== SENDING RESPONSE ===")
-        logger.info(f"Response: {response_data}")
-        return response_data
+        logger.debug("=== SENDING RESPONSE ===")
+        logger.debug("Response: %s", response_body)
+        return response_body
 
     except Exception as e:
         logger.error(f"=== ERROR PROCESSING OUTBOUND SMS ===")
         logger.error(f"Error: {e}")
-        import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
         response.status = 500
         return {"status": "error", "message": str(e)}
@@ -298,7 +735,9 @@ def forward_to_dhis2(phone_number, message_content, timestamp, sms_id):
         # Prepare payload according to DHIS2 SMS API format
         # Based on DHIS2 docs: text, originator, receiveddate, sentdate are mandatory
         # Format dates as YYYY-MM-DD and add smsstatus for proper classification
-        formatted_date = datetime.now().strftime('%Y-%m-%d')
+        # The date is the receive timestamp's own ISO prefix, so it matches the
+        # stored record instead of reading and formatting the clock again
+        formatted_date = timestamp[:10]
 
         payload = {
             'text': message_content,
@@ -338,7 +777,6 @@ def forward_to_dhis2(phone_number, message_content, timestamp, sms_id):
         return False, {"error": f"Network error: {str(e)}"}
     except Exception as e:
         logger.error(f"Unexpected error forwarding SMS {sms_id} to DHIS2: {e}")
-        import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
         return False, {"error": f"Unexpected error: {str(e)}"}
 
@@ -346,55 +784,56 @@ def forward_to_dhis2(phone_number, message_content, timestamp, sms_id):
 @app.route('/sms/receive', method='POST')
 def receive_sms():
     """Endpoint to receive inbound SMS (from external sources to DHIS2)"""
+    too_large = body_too_large()
+    if too_large:
+        return too_large
+
     try:
         logger.info("=== INBOUND SMS REQUEST RECEIVED ===")
-        logger.info(f"Method: {request.method}")
-        logger.info(f"Content-Type: {request.content_type}")
-        logger.info(f"Headers: {dict(request.headers)}")
-
-        # Log raw request for debugging
-        request.body.seek(0)
+        # Copying and formatting the request is only worth it when the
+        # output is actually kept
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Method: %s", request.method)
+            logger.debug("Content-Type: %s", request.content_type)
+            logger.debug("Headers: %s", dict(request.headers))
+
+        # Read the body once; it is both logged and parsed from this copy
         raw_body = request.body.read()
-        logger.info(f"Raw body: {raw_body}")
-        logger.info(f"Raw body decoded: {raw_body.decode('utf-8', errors='ignore')}")
-        request.body.seek(0)
+        if debug:
+            logger.debug("Raw body (%d bytes): %s", len(raw_body),
+                         raw_body[:RAW_BODY_LOG_LIMIT].decode('utf-8', errors='replace'))
 
         # Parse incoming request more robustly
         data = {}
 
         if request.content_type and 'application/json' in request.content_type:
             try:
-                data = request.json or {}
-                logger.info(f"Parsed JSON data: {data}")
+                data = json_loads(raw_body or b'{}') or {}
+                logger.debug("Parsed JSON data: %s", data)
             except Exception as e:
                 logger.warning(f"Failed to parse JSON: {e}")
-                # Try to get raw body as fallback
-                raw_body = request.body.read().decode('utf-8')
-                logger.info(f"Raw body content: {raw_body}")
-                data = {'raw_content': raw_body}
+                # Keep the raw body as fallback
+                raw_content = raw_body.decode('utf-8', errors='replace')
+                logger.debug("Raw body content: %s", raw_content)
+                data = {'raw_content': raw_content}
         else:
             # Handle form data or query params
-            data = dict(request.forms) or dict(request.params)
-            logger.info(f"Form/query data: {data}")
+            data = parse_form_data(raw_body)
+            logger.debug("Form/query data: %s", data)
 
         # Extract SMS details
-        phone_number = (data.get('originator') or
-                        data.get('from') or
-                        data.get('sender') or
-                        data.get('msisdn') or
-                        'unknown')
+        phone_number = extract_inbound_phone(data)
 
-        message_content = (data.get('message') or
-                           data.get('text') or
-                           data.get('content') or
-                           str(data))
+        message_content = extract_message(data, None) or str(data)
 
-        timestamp = datetime.now().isoformat()
+        now = datetime.now()
+        timestamp = now.isoformat()
 
-        logger.info(f"=== EXTRACTED SMS DATA ===")
-        logger.info(f"Phone: {phone_number}")
-        logger.info(f"Message: {message_content}")
-        logger.info(f"Timestamp: {timestamp}")
+        logger.debug("=== EXTRACTED SMS DATA ===")
+        logger.debug("Phone: %s", phone_number)
+        logger.debug("Message: %s", message_content)
+        logger.debug("Timestamp: %s", timestamp)
 
         # Store SMS in a structured format
         sms_data = {
@@ -402,6 +841,8 @@ def receive_sms():
             'phone': phone_number,
             'message': message_content,
             'timestamp': timestamp,
+            'timestamp_score': now.timestamp(),
+            'date_key': now.date().isoformat(),
             'raw_data': data,
             'dhis2_forwarded': False,
             'dhis2_response': None
@@ -422,29 +863,35 @@ def receive_sms():
         # Update SMS record with DHIS2 forwarding results
         if redis_client:
             try:
-                redis_client.hset(f"sms:{sms_id}", mapping={
+                pipe = redis_client.pipeline(transaction=False)
+                pipe.hset(f"sms:{sms_id}", mapping={
                     'dhis2_forwarded': 'true' if dhis2_success else 'false',
-                    'dhis2_response': json.dumps(dhis2_response),
+                    'dhis2_response': json_dumps(dhis2_response).decode(),
                     'dhis2_timestamp': datetime.now().isoformat(),
                     'processed': 'true' if dhis2_success else 'false'
                 })
 
                 if dhis2_success:
                     # Remove from unprocessed queue if successfully forwarded
-                    redis_client.lrem("sms:unprocessed", 1, sms_id)
+                    pipe.lrem("sms:unprocessed", 1, sms_id)
+
+                # Tell open dashboards this row changed
+                pipe.publish(SMS_STATUS_CHANNEL, sms_id)
+                pipe.execute()
 
                 logger.info(f"Updated SMS {sms_id} with DHIS2 forwarding status: {dhis2_success}")
             except Exception as redis_error:
                 logger.error(f"Failed to update SMS {sms_id} in Redis: {redis_error}")
 
         # Log the complete SMS data for debugging
-        complete_sms_data = {
-            **sms_data,
-            'dhis2_forwarded': dhis2_success,
-            'dhis2_response': dhis2_response
-        }
-        logger.info(f"=== COMPLETE INBOUND SMS DATA ===")
-        logger.info(f"{json.dumps(complete_sms_data, indent=2)}")
+        if debug:
+            complete_sms_data = {
+                **sms_data,
+                'dhis2_forwarded': dhis2_success,
+                'dhis2_response': dhis2_response
+            }
+            logger.debug("=== COMPLETE INBOUND SMS DATA ===")
+            logger.debug("%s", json_dumps_pretty(complete_sms_data))
 
         # Return response indicating both storage and forwarding status
         response_data = {
@@ -455,8 +902,8 @@ def receive_sms():
             "dhis2_response": dhis2_response
         }
 
-        logger.info(f"=== SENDING RESPONSE ===")
-        logger.info(f"Response: {response_data}")
+        logger.debug("=== SENDING RESPONSE ===")
+        logger.debug("Response: %s", response_data)
 
         # Set HTTP status based on DHIS2 forwarding success
         if not dhis2_success:
@@ -467,12 +914,58 @@ def receive_sms():
     except Exception as e:
         logger.error(f"=== ERROR PROCESSING INBOUND SMS ===")
         logger.error(f"Error: {e}")
-        import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
         response.status = 500
         return {"status": "error", "message": str(e)}
 
 
+# Timeline cursors name the score and id of an entry. Messages stored in the
+# same millisecond share a score, so paging by score alone would skip the rest
+# of a tie at a page boundary; within a score Redis orders entries by id.
+def format_cursor(entry):
+    """Encode a (sms_id, score) timeline entry as a listing cursor"""
+    sms_id, score = entry
+    return f"{score!r}:{sms_id}"
+
+
+def parse_cursor(cursor):
+    """Split a listing cursor into its score and SMS id"""
+    score, _, sms_id = cursor.partition(':')
+    return float(score), sms_id
+
+
+def entries_after(key, score, sms_id, limit):
+    """Return up to limit index entries that come after the given entry, newest first"""
+    # The bound is inclusive and the entries of the tie at or above sms_id are
+    # dropped; they sort first, so only a long tie needs another read
+    entries = []
+    start = 0
+    while True:
+        batch = redis_client.zrevrangebyscore(key, repr(score), "-inf", start=start, num=limit, withscores=True)
+        entries.extend(entry for entry in batch if entry[1] < score or entry[0] < sms_id)
+        if len(entries) >= limit or len(batch) < limit:
+            return entries[:limit]
+        start += limit
+
+
+def entries_since(key, score, sms_id, limit):
+    """Return up to limit index entries newer than the given entry, newest first"""
+    # The tie at or below sms_id sorts last, so dropping it keeps the newest;
+    # a bare score without an id drops the whole tie
+    entries = redis_client.zrevrangebyscore(key, "+inf", repr(score), start=0, num=limit, withscores=True)
+    return [entry for entry in entries if entry[1] > score or (sms_id and entry[0] > sms_id)]
+
+
+# Hash fields returned by /sms/list; index-filtered listings fetch them with
+# SORT ... GET, which needs every field named up front
+SMS_LIST_FIELDS = (
+    'id', 'type', 'phone', 'message', 'timestamp', 'ts', 'raw_data', 'processed',
+    'status', 'dhis2_forwarded', 'dhis2_response', 'dhis2_timestamp'
+)
+SMS_LIST_GET = [f"sms:*->{field}" for field in SMS_LIST_FIELDS]
+SMS_LIST_FIELD_KEYS = tuple(field.encode() for field in SMS_LIST_FIELDS)
+
+
 @app.route('/sms/list', method='GET')
 def list_sms():
     """List SMS messages from Redis"""
@@ -486,77 +979,130 @@ def list_sms():
         offset = int(request.params.get('offset', 0))
         phone = request.params.get('phone')
         date = request.params.get('date')
+        cursor = request.params.get('cursor')
+        since = request.params.get('since')
 
-        logger.info(f"SMS list request - limit: {limit}, offset: {offset}, phone: {phone}, date: {date}")
-
-        sms_ids = []
+        logger.debug("SMS list request - limit: %s, offset: %s, phone: %s, date: %s", limit, offset, phone, date)
 
-        if phone:
-            # Get SMS from specific phone number
-            sms_ids = list(redis_client.smembers(f"sms:phone:{phone}"))
-            logger.info(f"Found {len(sms_ids)} SMS for phone {phone}")
-        elif date:
-            # Get SMS from specific date
-            sms_ids = list(redis_client.smembers(f"sms:date:{date}"))
-            logger.info(f"Found {len(sms_ids)} SMS for date {date}")
+        sms_list = []
+        next_cursor = None
+        next_offset = None
+        latest_cursor = None
+
+        if phone or date:
+            # Page through the phone or date index newest first and project
+            # the hash fields server-side, so the whole listing is one SORT
+            # command; BY nosort on a sorted set keeps its score order
+            index_key = f"sms:timeline:phone:{phone}" if phone else f"sms:timeline:date:{date}"
+            values = redis_bytes.sort(index_key, start=offset, num=limit, by="nosort", desc=True,
+                                      get=SMS_LIST_GET)
+            # A full page from SORT means the index may hold more entries
+            if len(values) == limit * len(SMS_LIST_FIELDS):
+                next_offset = offset + limit
+            for row in zip(*[iter(values)] * len(SMS_LIST_FIELDS)):
+                # id is absent once the hash has expired out of the index
+                if row[0] is None:
+                    continue
+                sms_list.append(decode_sms_hash(
+                    {field: value for field, value in zip(SMS_LIST_FIELD_KEYS, row) if value is not None}
+                ))
+            logger.debug("Found %d SMS in %s (offset: %s, limit: %s)", len(sms_list), index_key, offset, limit)
         else:
             # Get SMS from timeline (most recent first)
-            sms_ids = redis_client.zrevrange("sms:timeline", offset, offset + limit - 1)
-            logger.info(f"Found {len(sms_ids)} SMS from timeline (offset: {offset}, limit: {limit})")
-
-        # Retrieve SMS data
-        sms_list = []
-        for sms_id in sms_ids:
-            sms_hash = redis_client.hgetall(f"sms:{sms_id}")
-            if sms_hash:
-                try:
-                    sms_hash['raw_data'] = json.loads(sms_hash.get('raw_data', '{}'))
-                except:
-                    pass
-                sms_list.append(sms_hash)
-                logger.info(f"Retrieved SMS {sms_id}: {sms_hash.get('message', 'No message')[:50]}...")
+            if since:
+                # Only the messages newer than the newest one already shown,
+                # so a refreshing dashboard fetches just what arrived
+                entries = entries_since("sms:timeline", *parse_cursor(since), limit)
+            elif cursor:
+                # Continue below the last message already shown, so a deep
+                # page costs the same as the first one
+                entries = entries_after("sms:timeline", *parse_cursor(cursor), limit)
             else:
-                logger.warning(f"SMS {sms_id} not found in Redis")
-
-        logger.info(f"Returning {len(sms_list)} SMS messages")
+                entries = redis_client.zrevrange("sms:timeline", offset, offset + limit - 1, withscores=True)
+            sms_ids = [sms_id for sms_id, _ in entries]
+            if entries:
+                latest_cursor = format_cursor(entries[0])
+            if len(entries) == limit and not since:
+                next_cursor = format_cursor(entries[-1])
+            logger.debug("Found %d SMS from timeline (offset: %s, cursor: %s, limit: %s)",
+                         len(sms_ids), offset, cursor, limit)
+
+            # Retrieve SMS data in a single round-trip, undecoded so raw_data
+            # goes into the response without a decode/encode pass
+            pipe = redis_bytes.pipeline(transaction=False)
+            for sms_id in sms_ids:
+                pipe.hgetall(f"sms:{sms_id}")
+
+            for sms_id, raw_hash in zip(sms_ids, pipe.execute()):
+                if raw_hash:
+                    sms_list.append(decode_sms_hash(raw_hash))
+                else:
+                    logger.warning(f"SMS {sms_id} not found in Redis")
+
+        logger.debug("Returning %d SMS messages", len(sms_list))
 
         return {
             "status": "success",
             "count": len(sms_list),
-            "sms": sms_list
+            "sms": sms_list,
+            "next_cursor": next_cursor,
+            "next_offset": next_offset,
+            "latest_cursor": latest_cursor
         }
 
     except Exception as e:
         logger.error(f"Error listing SMS: {e}")
-        import traceback
         logger.error(f"Traceback: {traceback.format_exc()}")
         response.status = 500
         return {"error": str(e)}
 
 
-@app.route('/sms/stats', method='GET')
-def sms_stats():
-    """Get SMS statistics from Redis"""
-    if not redis_client:
-        response.status = 503
-        return {"error": "Redis not available"}
-
-    try:
-        total_sms = redis_client.zcard("sms:timeline")
-        unprocessed_count = redis_client.llen("sms:unprocessed")
-
-        # Get today's SMS count
+def get_cached_stats():
+    """Return the encoded /sms/stats response, recomputing it once per TTL"""
+    # Every open dashboard polls the stats, so the encoded response is
+    # shared through Redis instead of being rebuilt per request
+    stats_body = redis_bytes.get(STATS_CACHE_KEY)
+    if stats_body is None:
+        # Get today's SMS count along with the totals in one round-trip;
+        # all three are O(1) counts on the timeline, queue and date index
         today = datetime.now().strftime('%Y-%m-%d')
-        today_count = redis_client.scard(f"sms:date:{today}")
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.zcard("sms:timeline")
+        pipe.llen("sms:unprocessed")
+        pipe.zcard(f"sms:timeline:date:{today}")
+        total_sms, unprocessed_count, today_count = pipe.execute()
 
-        return {
+        stats_body = json_dumps({
             "status": "success",
             "stats": {
                 "total_sms": total_sms,
                 "unprocessed": unprocessed_count,
                 "today": today_count
             }
-        }
+        })
+        redis_bytes.setex(STATS_CACHE_KEY, STATS_CACHE_TTL, stats_body)
+    return stats_body
+
+
+@app.route('/sms/stats', method='GET')
+def sms_stats():
+    """Get SMS statistics from Redis"""
+    if not redis_client:
+        response.status = 503
+        return {"error": "Redis not available"}
+
+    try:
+        stats_body = get_cached_stats()
+        etag = f'"{hashlib.sha1(stats_body).hexdigest()}"'
+        # Browsers revalidate on every fetch and get a bodiless 304 while
+        # the counts are unchanged
+        response.set_header('Cache-Control', 'no-cache')
+        response.set_header('ETag', etag)
+        if request.get_header('If-None-Match') == etag:
+            response.status = 304
+            return b''
+        response.content_type = 'application/json'
+        return stats_body
 
     except Exception as e:
         logger.error(f"Error getting SMS stats: {e}")
@@ -564,6 +1110,150 @@ def sms_stats():
         return {"error": str(e)}
 
 
+# Server-Sent Event name used for each channel
+SSE_EVENT_NAMES = {SMS_EVENTS_CHANNEL: 'sms', SMS_STATUS_CHANNEL: 'status'}
+# Seconds between comment lines on an idle /sms/stream, so proxies keep the
+# connection open and closed clients are noticed
+SSE_KEEPALIVE_SECONDS = 15
+# Events buffered per stream client before a stalled one starts missing them
+SSE_CLIENT_BUFFER = 100
+
+# Each worker holds one Redis subscription and fans its messages out to the
+# open /sms/stream connections, so viewers never tie up pool connections
+_sse_clients = set()
+_sse_listener = None
+
+
+def _listen_sms_events():
+    """Relay SMS ids published on the event channels to every open stream"""
+    while True:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(*SSE_EVENT_NAMES)
+            while True:
+                # Wait in bounded steps; a blocking listen() would trip the
+                # pool's socket timeout whenever no SMS arrives for a while
+                message = pubsub.get_message(timeout=SSE_KEEPALIVE_SECONDS)
+                if message is None:
+                    continue
+                event = (SSE_EVENT_NAMES[message['channel']], message['data'])
+                for client in list(_sse_clients):
+                    try:
+                        client.put_nowait(event)
+                    except gevent.queue.Full:
+                        pass
+        except Exception as e:
+            logger.error(f"SMS event subscription failed, retrying: {e}")
+            gevent.sleep(1)
+        finally:
+            pubsub.close()
+
+
+@app.route('/sms/stream', method='GET')
+def sms_stream():
+    """Push new SMS ids and forward status updates as Server-Sent Events"""
+    global _sse_listener
+    if not redis_client:
+        response.status = 503
+        return {"error": "Redis not available"}
+
+    if _sse_listener is None or _sse_listener.dead:
+        _sse_listener = gevent.spawn(_listen_sms_events)
+
+    response.content_type = 'text/event-stream'
+    response.set_header('Cache-Control', 'no-cache')
+    # Stop nginx and similar proxies from buffering the stream
+    response.set_header('X-Accel-Buffering', 'no')
+
+    def events():
+        client = gevent.queue.Queue(SSE_CLIENT_BUFFER)
+        _sse_clients.add(client)
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event, sms_id = client.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except gevent.queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f'event: {event}\ndata: {sms_id}\n\n'
+        finally:
+            _sse_clients.discard(client)
+
+    return events()
+
+
+# Messages read from Redis per pipeline while streaming a CSV export
+EXPORT_CHUNK_SIZE = 500
+EXPORT_CSV_FIELDS = ('id', 'phone', 'message', 'timestamp', 'type', 'status', 'processed')
+
+
+@app.route('/sms/export.csv', method='GET')
+def export_sms_csv():
+    """Stream SMS messages as CSV, newest first, optionally filtered by phone or date"""
+    if not redis_client:
+        response.status = 503
+        return {"error": "Redis not available"}
+
+    # Same filters as /sms/list; the export walks the matching index
+    phone = request.params.get('phone')
+    date = request.params.get('date')
+    if phone:
+        index_key = f"sms:timeline:phone:{phone}"
+    elif date:
+        index_key = f"sms:timeline:date:{date}"
+    else:
+        index_key = "sms:timeline"
+
+    response.content_type = 'text/csv; charset=utf-8'
+    response.set_header('Content-Disposition',
+                        f'attachment; filename="sms-export-{datetime.now().date().isoformat()}.csv"')
+
+    def generate_rows():
+        """Yield the CSV one chunk of messages at a time"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+        writer.writerow(['ID', 'Phone', 'Message', 'Timestamp', 'Type', 'Status', 'Processed'])
+        # Page by position rather than offset so SMS stored during the export
+        # do not shift later chunks and repeat rows
+        last_entry = None
+        try:
+            while True:
+                if last_entry is None:
+                    entries = redis_client.zrevrangebyscore(index_key, "+inf", "-inf",
+                                                            start=0, num=EXPORT_CHUNK_SIZE, withscores=True)
+                else:
+                    entries = entries_after(index_key, last_entry[1], last_entry[0], EXPORT_CHUNK_SIZE)
+                if not entries:
+                    break
+                sms_ids = [sms_id for sms_id, _ in entries]
+
+                pipe = redis_client.pipeline(transaction=False)
+                for sms_id in sms_ids:
+                    pipe.hmget(f"sms:{sms_id}", EXPORT_CSV_FIELDS)
+                for sms_id, phone, message, timestamp, sms_type, status, processed in pipe.execute():
+                    if sms_id is None:
+                        continue
+                    writer.writerow([sms_id, phone, message, timestamp,
+                                     sms_type or 'unknown', status or 'pending', processed])
+
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                if len(entries) < EXPORT_CHUNK_SIZE:
+                    break
+                last_entry = entries[-1]
+        except Exception as e:
+            logger.error(f"Error exporting SMS: {e}")
+            # Abort the response so the client sees a broken transfer instead
+            # of a CSV that looks complete
+            raise
+        # The header row, when nothing else has been sent yet
+        yield buffer.getvalue()
+
+    return generate_rows()
+
+
 @app.route('/sms/<sms_id>', method='GET')
 def get_sms(sms_id):
     """Get specific SMS by ID"""
@@ -572,15 +1262,12 @@ def get_sms(sms_id):
         return {"error": "Redis not available"}
 
     try:
-        sms_hash = redis_client.hgetall(f"sms:{sms_id}")
-        if not sms_hash:
+        raw_hash = redis_bytes.hgetall(f"sms:{sms_id}")
+        if not raw_hash:
             response.status = 404
             return {"error": "SMS not found"}
 
-        try:
-            sms_hash['raw_data'] = json.loads(sms_hash.get('raw_data', '{}'))
-        except:
-            pass
+        sms_hash = decode_sms_hash(raw_hash)
 
         return {
             "status": "success",
@@ -593,10 +1280,10 @@ def get_sms(sms_id):
         return {"error": str(e)}
 
 
-@app.route('/', method='GET')
-def dashboard():
-    """Main dashboard UI"""
-    html = '''
+# The dashboard is static (it loads its data through the JSON endpoints), so
+# it is minified, encoded and gzipped once at import time and can be cached by
+# browsers
+DASHBOARD_SOURCE = '''
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -631,6 +1318,7 @@ def dashboard():
             .loading { text-align: center; padding: 40px; color: #666; }
             .error { background: #e74c3c; color: white; padding: 10px; border-radius: 4px; margin: 10px 0; }
             .refresh-btn { float: right; }
+            .load-more { display: block; margin: 15px auto; padding: 8px 16px; background: #3498db; color: white; border: none; border-radius: 4px; cursor: pointer; }
             @media (max-width: 768px) {
                 .control-group { flex-direction: column; align-items: stretch; }
                 .sms-header { flex-direction: column; align-items: flex-start; }
@@ -689,11 +1377,16 @@ def dashboard():
             <div class="sms-list">
                 <div class="loading" id="loading">Loading SMS messages...</div>
                 <div id="sms-container"></div>
+                <button class="load-more" id="load-more" onclick="loadMoreSMS()" style="display: none">Load more</button>
             </div>
         </div>
 
         <script>
             let currentSMS = [];
+            // Query for the page after the ones shown, or null on the last page
+            let nextPage = null;
+            // Score of the newest message shown on the unfiltered timeline
+            let latestCursor = null;
 
             async function loadStats() {
                 try {
@@ -726,6 +1419,7 @@ def dashboard():
 
                 loading.style.display = 'block';
                 container.innerHTML = '';
+                document.getElementById('load-more').style.display = 'none';
 
                 try {
                     const params = new URLSearchParams();
@@ -745,7 +1439,9 @@ def dashboard():
 
                     if (data.status === 'success') {
                         currentSMS = data.sms;
+                        latestCursor = data.latest_cursor;
                         displaySMS(data.sms);
+                        setNextPage(params, data);
                     } else {
                         container.innerHTML = `<div class="error">Error: ${data.error || 'Unknown error'}</div>`;
                     }
@@ -755,6 +1451,82 @@ def dashboard():
                 }
             }
 
+            // Older pages are fetched on demand and appended, so only the
+            // newest page is loaded up front
+            function setNextPage(params, data) {
+                nextPage = null;
+                if (data.next_cursor !== null || data.next_offset !== null) {
+                    nextPage = new URLSearchParams(params);
+                    nextPage.delete('cursor');
+                    nextPage.delete('offset');
+                    if (data.next_cursor !== null) nextPage.set('cursor', data.next_cursor);
+                    else nextPage.set('offset', data.next_offset);
+                }
+                document.getElementById('load-more').style.display = nextPage ? 'block' : 'none';
+            }
+
+            async function loadMoreSMS() {
+                if (!nextPage) return;
+                const params = nextPage;
+                try {
+                    const response = await fetch(`/sms/list?${params}`);
+                    const data = await response.json();
+
+                    if (data.status === 'success') {
+                        currentSMS = currentSMS.concat(data.sms);
+                        document.getElementById('sms-container').insertAdjacentHTML('beforeend', renderSMS(data.sms));
+                        setNextPage(params, data);
+                    }
+                } catch (error) {
+                    console.error('Error loading more SMS:', error);
+                }
+            }
+
+            // Prepend the messages stored since the newest one shown; fall back
+            // to a full reload when there is nothing to continue from or more
+            // arrived than one page holds
+            async function loadNewSMS() {
+                const limit = document.getElementById('limit-filter').value;
+                if (latestCursor === null || currentSMS.length === 0) {
+                    loadSMS();
+                    return;
+                }
+                try {
+                    const params = new URLSearchParams({since: latestCursor, limit: limit});
+                    const response = await fetch(`/sms/list?${params}`);
+                    const data = await response.json();
+
+                    if (data.status !== 'success' || data.count >= Number(limit)) {
+                        loadSMS();
+                    } else if (data.count > 0) {
+                        currentSMS = data.sms.concat(currentSMS);
+                        latestCursor = data.latest_cursor;
+                        document.getElementById('sms-container').insertAdjacentHTML('afterbegin', renderSMS(data.sms));
+                    }
+                } catch (error) {
+                    console.error('Error loading new SMS:', error);
+                }
+            }
+
+            // Re-render a row whose forward status changed after it was
+            // fetched; rows not on screen pick up the status when loaded
+            async function refreshRow(id) {
+                const selector = `.sms-item[data-id="${CSS.escape(id)}"]`;
+                if (!document.querySelector(selector)) return;
+                try {
+                    const response = await fetch(`/sms/${encodeURIComponent(id)}`);
+                    const data = await response.json();
+                    if (data.status !== 'success') return;
+                    const index = currentSMS.findIndex(sms => sms.id === id);
+                    if (index !== -1) currentSMS[index] = data.sms;
+                    // The list may have been reloaded while the fetch ran
+                    const row = document.querySelector(selector);
+                    if (row) row.outerHTML = renderSMS([data.sms]);
+                } catch (error) {
+                    console.error('Error refreshing SMS:', error);
+                }
+            }
+
             function displaySMS(smsArray) {
                 const container = document.getElementById('sms-container');
 
@@ -763,17 +1535,21 @@ def dashboard():
                     return;
                 }
 
-                container.innerHTML = smsArray.map(sms => `
-                    <div class="sms-item">
+                container.innerHTML = renderSMS(smsArray);
+            }
+
+            function renderSMS(smsArray) {
+                return smsArray.map(sms => `
+                    <div class="sms-item" data-id="${escapeHtml(sms.id)}">
                         <div class="sms-header">
-                            <span class="sms-phone">${sms.phone}</span>
+                            <span class="sms-phone">${escapeHtml(sms.phone)}</span>
                             <span class="sms-time">${formatTime(sms.timestamp)}</span>
                         </div>
                         <div class="sms-message">${escapeHtml(sms.message)}</div>
                         <div class="sms-id">
-                            ID: ${sms.id} | 
-                            Type: <span style="color: ${sms.type === 'outbound' ? '#e74c3c' : '#27ae60'}">${sms.type || 'unknown'}</span> | 
-                            Status: ${sms.status || 'pending'} | 
+                            ID: ${escapeHtml(sms.id)} | 
+                            Type: <span style="color: ${sms.type === 'outbound' ? '#e74c3c' : '#27ae60'}">${escapeHtml(sms.type || 'unknown')}</span> | 
+                            Status: ${escapeHtml(sms.status || 'pending')} | 
                             Processed: ${sms.processed === 'true' ? 'Yes' : 'No'}
                         </div>
                     </div>
@@ -788,10 +1564,10 @@ def dashboard():
                 }
             }
 
+            // One regex pass per value instead of a throwaway DOM node per call
+            const HTML_ESCAPES = {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'};
             function escapeHtml(text) {
-                const div = document.createElement('div');
-                div.textContent = text;
-                return div.innerHTML;
+                return String(text ?? '').replace(/[&<>"']/g, ch => HTML_ESCAPES[ch]);
             }
 
             function clearFilters() {
@@ -825,32 +1601,44 @@ def dashboard():
             }
 
             function exportSMS() {
-                if (currentSMS.length === 0) {
-                    alert('No SMS data to export');
-                    return;
-                }
-
-                const csv = [
-                    'ID,Phone,Message,Timestamp,Type,Status,Processed',
-                    ...currentSMS.map(sms => `"${sms.id}","${sms.phone}","${sms.message.replace(/"/g, '""')}","${sms.timestamp}","${sms.type || 'unknown'}","${sms.status || 'pending'}","${sms.processed}"`)
-                ].join('\\n');
-
-                const blob = new Blob([csv], { type: 'text/csv' });
-                const url = window.URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.href = url;
-                a.download = `sms-export-${new Date().toISOString().split('T')[0]}.csv`;
-                a.click();
-                window.URL.revokeObjectURL(url);
+                // The server streams the CSV, so the browser never holds the full list
+                const params = new URLSearchParams();
+                const phone = document.getElementById('phone-filter').value;
+                const date = document.getElementById('date-filter').value;
+                if (phone) params.append('phone', phone);
+                if (date) params.append('date', date);
+                window.location = `/sms/export.csv?${params}`;
             }
 
-            // Auto-refresh every 30 seconds
-            setInterval(() => {
-                loadStats();
-                if (!document.getElementById('phone-filter').value && !document.getElementById('date-filter').value) {
-                    loadSMS();
-                }
-            }, 30000);
+            // Refresh when the server reports a new SMS or a forward status
+            // change; bursts are coalesced into one fetch per second. The
+            // server caches the stats for 10s, so they are fetched again once
+            // that has expired after the last event
+            let refreshTimer = null;
+            let statsTimer = null;
+            let newSMSPending = false;
+            function scheduleRefresh(newSMS) {
+                newSMSPending = newSMSPending || newSMS;
+                clearTimeout(statsTimer);
+                statsTimer = setTimeout(loadStats, 11000);
+                if (refreshTimer) return;
+                refreshTimer = setTimeout(() => {
+                    refreshTimer = null;
+                    loadStats();
+                    if (newSMSPending && !document.getElementById('phone-filter').value && !document.getElementById('date-filter').value) {
+                        loadNewSMS();
+                    }
+                    newSMSPending = false;
+                }, 1000);
+            }
+            const events = new EventSource('/sms/stream');
+            events.addEventListener('sms', () => scheduleRefresh(true));
+            events.addEventListener('status', (event) => {
+                refreshRow(event.data);
+                scheduleRefresh(false);
+            });
+            // The browser reconnects on its own; refresh the Redis status meanwhile
+            events.onerror = () => loadStats();
 
             // Initial load
             loadStats();
@@ -859,8 +1647,36 @@ def dashboard():
     </body>
     </html>
     '''
-    response.content_type = 'text/html'
-    return html
+# Dropping indentation and blank lines keeps every line break, so the inline
+# JavaScript (including // comments) is left intact
+DASHBOARD_HTML = '\n'.join(
+    line.strip() for line in DASHBOARD_SOURCE.splitlines() if line.strip()
+).encode('utf-8')
+DASHBOARD_GZIP = gzip.compress(DASHBOARD_HTML, compresslevel=9, mtime=0)
+DASHBOARD_ETAG = f'"{hashlib.sha1(DASHBOARD_HTML).hexdigest()}"'
+DASHBOARD_GZIP_ETAG = f'"{hashlib.sha1(DASHBOARD_GZIP).hexdigest()}"'
+
+
+@app.route('/', method='GET')
+def dashboard():
+    """Main dashboard UI"""
+    use_gzip = 'gzip' in request.get_header('Accept-Encoding', '')
+    body, etag = (DASHBOARD_GZIP, DASHBOARD_GZIP_ETAG) if use_gzip else (DASHBOARD_HTML, DASHBOARD_ETAG)
+    response.set_header('Cache-Control', 'public, max-age=300')
+    response.set_header('Vary', 'Accept-Encoding')
+    response.set_header('ETag', etag)
+    # Revalidating browsers already have this exact page
+    if request.get_header('If-None-Match') == etag:
+        response.status = 304
+        return b''
+    response.content_type = 'text/html; charset=utf-8'
+    if use_gzip:
+        response.set_header('Content-Encoding', 'gzip')
+    return body
+
+
+# Number of key names /debug/redis samples through SCAN
+DEBUG_SAMPLE_KEYS = 100
 
 
 @app.route('/debug/redis', method='GET')
@@ -873,19 +1689,19 @@ def debug_redis():
         # Test Redis connection
         redis_client.ping()
 
-        # Get Redis info
+        # Get Redis info without KEYS or full-range reads, which block the
+        # server and grow with the dataset; samples are capped instead
         info = {
             "redis_connected": True,
-            "total_keys": len(redis_client.keys("*")),
-            "sms_keys": len(redis_client.keys("sms:*")),
+            "total_keys": redis_client.dbsize(),
             "timeline_count": redis_client.zcard("sms:timeline"),
             "unprocessed_count": redis_client.llen("sms:unprocessed"),
-            "all_keys": redis_client.keys("*"),
-            "timeline_data": redis_client.zrange("sms:timeline", 0, -1, withscores=True)
+            "sample_keys": list(itertools.islice(redis_client.scan_iter(match="sms:*", count=1000), DEBUG_SAMPLE_KEYS)),
+            "timeline_data": redis_client.zrevrange("sms:timeline", 0, 19, withscores=True)
         }
 
         # Get sample SMS data
-        sms_ids = redis_client.zrange("sms:timeline", 0, 4)  # Get first 5
+        sms_ids = redis_client.zrevrange("sms:timeline", 0, 4)  # Get latest 5
         sample_sms = []
         for sms_id in sms_ids:
             sms_data = redis_client.hgetall(f"sms:{sms_id}")
@@ -900,68 +1716,200 @@ def debug_redis():
         return {"error": f"Redis debug failed: {e}"}
 
 
-@app.route('/debug/fix-timeline', method='POST')
-def fix_timeline():
-    """Fix timeline for existing SMS that weren't added properly"""
-    try:
-        if not redis_client:
-            return {"error": "Redis not available"}
-
-        # Get all SMS keys
-        sms_keys = redis_client.keys("sms:*")
-        sms_keys = [key for key in sms_keys if key.startswith("sms:") and len(key.split(":")) == 2]
+# One SCAN page of /debug/fix-timeline, run server-side so each page costs a
+# single round trip instead of a SCAN plus a pipeline of HGETALLs
+# KEYS: timeline
+# ARGV: scan cursor, scan count, index ttl seconds
+# Hashes with a numeric ts field are re-added to the timeline and to their
+# phone/type/date indexes right here. Older hashes only have the ISO
+# timestamp, and Redis Lua has no date functions, so their id, timestamp,
+# phone and type are returned for the client to score and index.
+# The unsorted sms:phone/type/date sets written before the indexes became
+# sorted sets are unlinked as the scan reaches them.
+# Returns the next cursor, the number re-added, the number of legacy sets
+# removed, then the id/timestamp/phone/type groups.
+# Each call only covers one page, so Redis is never blocked by a full scan.
+FIX_TIMELINE_PAGE_LUA = """
+local page = redis.call('SCAN', ARGV[1], 'MATCH', 'sms:*', 'COUNT', ARGV[2])
+local found = {page[1], 0, 0}
+for _, key in ipairs(page[2]) do
+    if not string.find(key, ':', 5, true) then
+        -- sms:timeline and sms:unprocessed are not hashes
+        if redis.call('TYPE', key).ok == 'hash' then
+            local stamp = redis.call('HMGET', key, 'ts', 'timestamp', 'phone', 'type')
+            local sms_id = string.sub(key, 5)
+            local phone = stamp[3] or 'unknown'
+            local sms_type = stamp[4] or 'inbound'
+            if stamp[1] or stamp[2] then
+                redis.call('HSETNX', key, 'type', 'inbound')
+            end
+            if stamp[1] and stamp[2] then
+                redis.call('ZADD', KEYS[1], stamp[1], sms_id)
+                for _, index in ipairs({'sms:timeline:phone:' .. phone,
+                                        'sms:timeline:type:' .. sms_type,
+                                        'sms:timeline:date:' .. string.sub(stamp[2], 1, 10)}) do
+                    redis.call('ZADD', index, stamp[1], sms_id)
+                    redis.call('EXPIRE', index, ARGV[3])
+                end
+                found[2] = found[2] + 1
+            elseif stamp[2] then
+                found[#found + 1] = sms_id
+                found[#found + 1] = stamp[2]
+                found[#found + 1] = phone
+                found[#found + 1] = sms_type
+            end
+        end
+    elseif (string.find(key, '^sms:phone:') or string.find(key, '^sms:type:') or
+            string.find(key, '^sms:date:')) and redis.call('TYPE', key).ok == 'set' then
+        redis.call('UNLINK', key)
+        found[3] = found[3] + 1
+    end
+end
+return found
+"""
+# Keys examined per SCAN page by /debug/fix-timeline
+FIX_TIMELINE_SCAN_COUNT = 1000
+
+# Stores the score computed for a hash that only had its ISO timestamp, so
+# later rebuilds take the server-side path; a hash that expired meanwhile is
+# not recreated
+# KEYS: sms hash
+# ARGV: timeline score
+SET_SMS_SCORE_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HSET', KEYS[1], 'ts', ARGV[1])
+end
+"""
 
+fix_timeline_page_script = None
+set_sms_score_script = None
+if redis_client:
+    fix_timeline_page_script = redis_client.register_script(FIX_TIMELINE_PAGE_LUA)
+    set_sms_score_script = redis_client.register_script(SET_SMS_SCORE_LUA)
+
+
+def fix_timeline_page(cursor):
+    """Re-index one SCAN page of SMS hashes, returning the next cursor and the fixed/legacy counts"""
+    reply = fix_timeline_page_script(keys=["sms:timeline"],
+                                     args=[cursor, FIX_TIMELINE_SCAN_COUNT, SMS_TTL_SECONDS])
+    next_cursor, fixed_count, legacy_count, found = reply[0], reply[1], reply[2], reply[3:]
+    if not found:
+        return next_cursor, fixed_count, legacy_count
+
+    # The rest of the page is scored here and written in one pipeline
+    pipe = redis_client.pipeline(transaction=False)
+    scores = {}
+    for sms_id, timestamp, phone, sms_type in zip(*[iter(found)] * 4):
+        try:
+            score = _timestamp_score(timestamp)
+            date_key = timestamp[:10]
+            set_sms_score_script(keys=[f"sms:{sms_id}"], args=[score], client=pipe)
+        except ValueError:
+            # Without a parseable timestamp there is no date to index the
+            # message under on later rebuilds, so no ts is stored
+            score = time.time()
+            date_key = datetime.now().date().isoformat()
+        scores[sms_id] = score
+        for index_key in (f"sms:timeline:phone:{phone}", f"sms:timeline:type:{sms_type}",
+                          f"sms:timeline:date:{date_key}"):
+            pipe.zadd(index_key, {sms_id: score})
+            pipe.expire(index_key, SMS_TTL_SECONDS)
+    pipe.zadd("sms:timeline", scores)
+    pipe.execute()
+    return next_cursor, fixed_count + len(scores), legacy_count
+
+
+# Fix-timeline jobs run in the background; their state lives in Redis so any
+# worker process can answer a status request
+FIX_TIMELINE_JOB_TTL = 60 * 60
+
+
+def run_fix_timeline(job_id):
+    """Re-add every stored SMS hash to the timeline and indexes and record the outcome"""
+    try:
         fixed_count = 0
+        legacy_count = 0
+        cursor = "0"
+        while True:
+            cursor, count, legacy = fix_timeline_page(cursor)
+            fixed_count += count
+            legacy_count += legacy
+            if cursor == "0":
+                break
 
-        for sms_key in sms_keys:
-            sms_id = sms_key.split(":")[-1]
-            sms_data = redis_client.hgetall(sms_key)
-
-            if sms_data and 'timestamp' in sms_data:
-                try:
-                    timestamp = sms_data['timestamp']
-                    # Parse timestamp
-                    if 'T' in timestamp:
-                        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    else:
-                        dt = datetime.now()
+        timeline_count = redis_client.zcard("sms:timeline")
 
-                    timestamp_score = dt.timestamp()
+        result = {
+            "status": "success",
+            "job_id": job_id,
+            "fixed_count": fixed_count,
+            "legacy_indexes_removed": legacy_count,
+            "timeline_count": timeline_count,
+            "message": (f"Fixed {fixed_count} SMS messages, removed {legacy_count} legacy index sets, "
+                        f"timeline now has {timeline_count} entries")
+        }
+        logger.info(result["message"])
 
-                    # Add to timeline
-                    redis_client.zadd("sms:timeline", {sms_id: timestamp_score})
+    except Exception as e:
+        logger.error(f"Fix timeline job {job_id} failed: {e}")
+        result = {"status": "error", "job_id": job_id, "error": f"Fix timeline failed: {e}"}
 
-                    # Ensure type field exists
-                    if 'type' not in sms_data:
-                        redis_client.hset(sms_key, 'type', 'inbound')
+    redis_bytes.setex(f"sms:jobs:fix-timeline:{job_id}", FIX_TIMELINE_JOB_TTL, json_dumps(result))
 
-                    fixed_count += 1
 
-                except Exception as e:
-                    logger.error(f"Error fixing SMS {sms_id}: {e}")
+@app.route('/debug/fix-timeline', method='POST')
+def fix_timeline():
+    """Start fixing the timeline for existing SMS that weren't added properly"""
+    try:
+        if not redis_client:
+            return {"error": "Redis not available"}
 
-        timeline_count = redis_client.zcard("sms:timeline")
+        # The rebuild scans every key, so it runs on its own greenlet and the
+        # caller polls for the result instead of holding the request open
+        job_id = os.urandom(8).hex()
+        redis_bytes.setex(f"sms:jobs:fix-timeline:{job_id}", FIX_TIMELINE_JOB_TTL,
+                          json_dumps({"status": "running", "job_id": job_id}))
+        gevent.spawn(run_fix_timeline, job_id)
 
+        response.status = 202
         return {
-            "status": "success",
-            "fixed_count": fixed_count,
-            "timeline_count": timeline_count,
-            "message": f"Fixed {fixed_count} SMS messages, timeline now has {timeline_count} entries"
+            "status": "accepted",
+            "job_id": job_id,
+            "status_url": f"/debug/fix-timeline/status/{job_id}"
         }
 
     except Exception as e:
         return {"error": f"Fix timeline failed: {e}"}
 
 
+@app.route('/debug/fix-timeline/status/<job_id>', method='GET')
+def fix_timeline_status(job_id):
+    """Report whether a fix-timeline job is still running, or its result"""
+    if not redis_client:
+        response.status = 503
+        return {"error": "Redis not available"}
+
+    job_state = redis_bytes.get(f"sms:jobs:fix-timeline:{job_id}")
+    if job_state is None:
+        response.status = 404
+        return {"error": f"Fix timeline job {job_id} not found"}
+
+    response.content_type = 'application/json'
+    return job_state
+
+
 @app.route('/debug/test-storage', method='POST')
 def test_storage():
     """Test storing SMS data manually"""
     try:
+        now = datetime.now()
         test_sms = {
             'type': 'test',
             'phone': '+123456789',
             'message': 'Test storage message',
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now.isoformat(),
+            'timestamp_score': now.timestamp(),
+            'date_key': now.date().isoformat(),
             'raw_data': {'test': True}
         }
 
@@ -975,272 +1923,6 @@ def test_storage():
 
     except Exception as e:
         return {"error": f"Storage test failed: {e}"}
-    """Main dashboard UI"""
-    html = '''
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>DHIS2 SMS Gateway Dashboard</title>
-        <style>
-            * { margin: 0; padding: 0; box-sizing: border-box; }
-            body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; background: #f5f5f5; color: #333; }
-            .container { max-width: 1200px; margin: 0 auto; padding: 20px; }
-            .header { background: #2c3e50; color: white; padding: 20px; border-radius: 8px; margin-bottom: 20px; }
-            .header h1 { margin-bottom: 10px; }
-            .stats-grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin-bottom: 30px; }
-            .stat-card { background: white; padding: 20px; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); text-align: center; }
-            .stat-number { font-size: 2em; font-weight: bold; color: #3498db; }
-            .stat-label { color: #666; margin-top: 5px; }
-            .controls { background: white; padding: 20px; border-radius: 8px; margin-bottom: 20px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
-            .controls h3 { margin-bottom: 15px; }
-            .control-group { display: flex; gap: 10px; align-items: center; margin-bottom: 15px; flex-wrap: wrap; }
-            .control-group label { min-width: 100px; }
-            .control-group input, .control-group select, .control-group button { padding: 8px 12px; border: 1px solid #ddd; border-radius: 4px; }
-            .control-group button { background: #3498db; color: white; border: none; cursor: pointer; }
-            .control-group button:hover { background: #2980b9; }
-            .sms-list { background: white; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }
-            .sms-item { padding: 15px; border-bottom: 1px solid #eee; }
-            .sms-item:last-child { border-bottom: none; }
-            .sms-header { display: flex; justify-content: between; align-items: center; margin-bottom: 8px; }
-            .sms-phone { font-weight: bold; color: #2c3e50; }
-            .sms-time { color: #666; font-size: 0.9em; }
-            .sms-message { background: #f8f9fa; padding: 10px; border-radius: 4px; margin-top: 8px; }
-            .sms-id { font-size: 0.8em; color: #999; }
-            .loading { text-align: center; padding: 40px; color: #666; }
-            .error { background: #e74c3c; color: white; padding: 10px; border-radius: 4px; margin: 10px 0; }
-            .refresh-btn { float: right; }
-            @media (max-width: 768px) {
-                .control-group { flex-direction: column; align-items: stretch; }
-                .sms-header { flex-direction: column; align-items: flex-start; }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>DHIS2 SMS Gateway Dashboard</h1>
-                <p>Monitor and manage incoming SMS messages</p>
-            </div>
-
-            <div class="stats-grid" id="stats">
-                <div class="stat-card">
-                    <div class="stat-number" id="total-sms">-</div>
-                    <div class="stat-label">Total SMS</div>
-                </div>
-                <div class="stat-card">
-                    <div class="stat-number" id="today-sms">-</div>
-                    <div class="stat-label">Today</div>
-                </div>
-                <div class="stat-card">
-                    <div class="stat-number" id="unprocessed-sms">-</div>
-                    <div class="stat-label">Unprocessed</div>
-                </div>
-                <div class="stat-card">
-                    <div class="stat-number" id="redis-status">-</div>
-                    <div class="stat-label">Redis Status</div>
-                </div>
-            </div>
-
-            <div class="controls">
-                <h3>Filters & Controls <button class="refresh-btn" onclick="loadSMS()">Refresh</button></h3>
-                <div class="control-group">
-                    <label>Phone:</label>
-                    <input type="text" id="phone-filter" placeholder="Enter phone number">
-                    <label>Date:</label>
-                    <input type="date" id="date-filter">
-                    <label>Limit:</label>
-                    <select id="limit-filter">
-                        <option value="10">10</option>
-                        <option value="25" selected>25</option>
-                        <option value="50">50</option>
-                        <option value="100">100</option>
-                    </select>
-                    <button onclick="loadSMS()">Filter</button>
-                    <button onclick="clearFilters()">Clear</button>
-                </div>
-                <div class="control-group">
-                    <button onclick="sendTestSMS()">Send Test SMS</button>
-                    <button onclick="exportSMS()">Export CSV</button>
-                </div>
-            </div>
-
-            <div class="sms-list">
-                <div class="loading" id="loading">Loading SMS messages...</div>
-                <div id="sms-container"></div>
-            </div>
-        </div>
-
-        <script>
-            let currentSMS = [];
-
-            async function loadStats() {
-                try {
-                    const response = await fetch('/sms/stats');
-                    const data = await response.json();
-
-                    if (data.status === 'success') {
-                        document.getElementById('total-sms').textContent = data.stats.total_sms;
-                        document.getElementById('today-sms').textContent = data.stats.today;
-                        document.getElementById('unprocessed-sms').textContent = data.stats.unprocessed;
-                    }
-                } catch (error) {
-                    console.error('Error loading stats:', error);
-                }
-
-                try {
-                    const response = await fetch('/health');
-                    const data = await response.json();
-                    const redisStatus = document.getElementById('redis-status');
-                    redisStatus.textContent = data.redis;
-                    redisStatus.style.color = data.redis === 'healthy' ? '#27ae60' : '#e74c3c';
-                } catch (error) {
-                    console.error('Error loading health:', error);
-                }
-            }
-
-            async function loadSMS() {
-                const loading = document.getElementById('loading');
-                const container = document.getElementById('sms-container');
-
-                loading.style.display = 'block';
-                container.innerHTML = '';
-
-                try {
-                    const params = new URLSearchParams();
-
-                    const phone = document.getElementById('phone-filter').value;
-                    const date = document.getElementById('date-filter').value;
-                    const limit = document.getElementById('limit-filter').value;
-
-                    if (phone) params.append('phone', phone);
-                    if (date) params.append('date', date);
-                    if (limit) params.append('limit', limit);
-
-                    const response = await fetch(`/sms/list?${params}`);
-                    const data = await response.json();
-
-                    loading.style.display = 'none';
-
-                    if (data.status === 'success') {
-                        currentSMS = data.sms;
-                        displaySMS(data.sms);
-                    } else {
-                        container.innerHTML = `<div class="error">Error: ${data.error || 'Unknown error'}</div>`;
-                    }
-                } catch (error) {
-                    loading.style.display = 'none';
-                    container.innerHTML = `<div class="error">Error loading SMS: ${error.message}</div>`;
-                }
-            }
-
-            function displaySMS(smsArray) {
-                const container = document.getElementById('sms-container');
-
-                if (smsArray.length === 0) {
-                    container.innerHTML = '<div class="loading">No SMS messages found</div>';
-                    return;
-                }
-
-                container.innerHTML = smsArray.map(sms => `
-                    <div class="sms-item">
-                        <div class="sms-header">
-                            <span class="sms-phone">${sms.phone}</span>
-                            <span class="sms-time">${formatTime(sms.timestamp)}</span>
-                        </div>
-                        <div class="sms-message">${escapeHtml(sms.message)}</div>
-                        <div class="sms-id">
-                            ID: ${sms.id} | 
-                            Type: <span style="color: ${sms.type === 'outbound' ? '#e74c3c' : '#27ae60'}">${sms.type || 'unknown'}</span> | 
-                            Status: ${sms.status || 'pending'} | 
-                            Processed: ${sms.processed === 'true' ? 'Yes' : 'No'}
-                        </div>
-                    </div>
-                `).join('');
-            }
-
-            function formatTime(timestamp) {
-                try {
-                    return new Date(timestamp).toLocaleString();
-                } catch {
-                    return timestamp;
-                }
-            }
-
-            function escapeHtml(text) {
-                const div = document.createElement('div');
-                div.textContent = text;
-                return div.innerHTML;
-            }
-
-            function clearFilters() {
-                document.getElementById('phone-filter').value = '';
-                document.getElementById('date-filter').value = '';
-                document.getElementById('limit-filter').value = '25';
-                loadSMS();
-            }
-
-            async function sendTestSMS() {
-                try {
-                    const response = await fetch('/sms/receive', {
-                        method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({
-                            originator: '+1234567890',
-                            message: `Test SMS sent at ${new Date().toLocaleString()}`
-                        })
-                    });
-
-                    const result = await response.json();
-                    alert(result.status === 'success' ? 'Test SMS sent successfully!' : 'Error sending test SMS');
-
-                    if (result.status === 'success') {
-                        loadStats();
-                        loadSMS();
-                    }
-                } catch (error) {
-                    alert('Error sending test SMS: ' + error.message);
-                }
-            }
-
-            function exportSMS() {
-                if (currentSMS.length === 0) {
-                    alert('No SMS data to export');
-                    return;
-                }
-
-                const csv = [
-                    'ID,Phone,Message,Timestamp,Processed',
-                    ...currentSMS.map(sms => `"${sms.id}","${sms.phone}","${sms.message.replace(/"/g, '""')}","${sms.timestamp}","${sms.processed}"`)
-                ].join('\\n');
-
-                const blob = new Blob([csv], { type: 'text/csv' });
-                const url = window.URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.href = url;
-                a.download = `sms-export-${new Date().toISOString().split('T')[0]}.csv`;
-                a.click();
-                window.URL.revokeObjectURL(url);
-            }
-
-            // Auto-refresh every 30 seconds
-            setInterval(() => {
-                loadStats();
-                if (!document.getElementById('phone-filter').value && !document.getElementById('date-filter').value) {
-                    loadSMS();
-                }
-            }, 30000);
-
-            // Initial load
-            loadStats();
-            loadSMS();
-        </script>
-    </body>
-    </html>
-    '''
-    response.content_type = 'text/html'
-    return html
 
 
 @app.route('/health', method='GET')
@@ -1264,5 +1946,12 @@ def health_check():
 
 if __name__ == '__main__':
     logger.info(f"Starting SMS receiver on port {SMS_PORT}")
-    logger.info(f"Redis configuration: {REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}")
-    run(app, host='0.0.0.0', port=SMS_PORT)
+    logger.info(f"Redis configuration: {REDIS_LOCATION}/{REDIS_DB}")
+    # Send gevent's per-request access and error lines through the queued
+    # logging handlers instead of writing them synchronously to stderr
+    WSGIServer(
+        ('0.0.0.0', SMS_PORT),
+        app,
+        log=logging.getLogger('dhis2_sms_receiver.access'),
+        error_log=logging.getLogger('dhis2_sms_receiver.server')
+    ).serve_forever()
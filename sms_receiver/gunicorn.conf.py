@@ -0,0 +1,16 @@
+"""
+Gunicorn settings for the SMS receiver.
+Each worker runs gevent, so a single process overlaps many requests that are
+waiting on Redis or DHIS2 instead of holding a thread per request.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('SMS_PORT', 8002)}"
+worker_class = 'gevent'
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+# Concurrent requests (greenlets) per worker
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+# Seconds an idle keep-alive connection stays open, so the dashboard's polls
+# reuse one socket instead of reconnecting every time
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 30))